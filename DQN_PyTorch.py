@@ -2,8 +2,15 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
+from torch.func import functional_call
 import os
 
+
+def bellman_target(r, t, q_t, discount: float):
+    """Bellman equation target: r + (1-t) * discount * q_t"""
+    return r + (1.0 - t) * discount * q_t
+
+
 class DQN(nn.Module):
     def __init__(self, params):
         super(DQN, self).__init__()
@@ -41,10 +48,39 @@ class DQN(nn.Module):
         # 4 outputs, one for each action (North, East, South, West)
         self.fc4 = nn.Linear(in_features=256, out_features=4)
 
+        # --- Device ---
+        # Run on the GPU when one is available, otherwise fall back to CPU.
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.to(self.device)
+        if self.device.type == 'cuda':
+            # Input shapes never change during training, so let cuDNN
+            # autotune the conv algorithms once, and allow TF32 tensor cores
+            # for the convs and matmuls on Ampere+ GPUs.
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+        # Keep conv weights in channels-last (NHWC) layout so cuDNN can skip
+        # the internal NCHW -> NHWC reorder on tensor-core GPUs.
+        self.to(memory_format=torch.channels_last)
+
         # --- Optimizer and Loss Function ---
         self.optimizer = optim.Adam(self.parameters(), lr=params['lr'])
         self.loss_fn = nn.MSELoss() # MSE loss is equivalent to the TF cost function
 
+        # --- Mixed Precision ---
+        # On CUDA the forward passes run under autocast. BF16 has the same
+        # exponent range as FP32 and needs no loss scaling; older GPUs without
+        # BF16 fall back to FP16 with a GradScaler. On CPU both are disabled.
+        self.use_amp = self.device.type == 'cuda'
+        if self.use_amp and torch.cuda.is_bf16_supported():
+            self.amp_dtype = torch.bfloat16
+        else:
+            self.amp_dtype = torch.float16
+        self.scaler = torch.amp.GradScaler(
+            self.device.type,
+            enabled=(self.use_amp and self.amp_dtype == torch.float16)
+        )
+
         # --- Global Step and Model Loading ---
         self.global_step = 0
         if self.params['load_file'] is not None:
@@ -52,7 +88,7 @@ class DQN(nn.Module):
                 print('Loading checkpoint...')
                 try:
                     # Load the saved model state
-                    self.load_state_dict(torch.load(self.params['load_file']))
+                    self.load_state_dict(torch.load(self.params['load_file'], map_location=self.device))
                     step_str = self.params['load_file'].split('_')[-2]
                     self.global_step = int(step_str)
                     print(f"Loaded model, resuming from step {self.global_step}")
@@ -61,6 +97,97 @@ class DQN(nn.Module):
             else:
                 print(f"Could not find model at {self.params['load_file']}, starting from scratch.")
 
+        # --- Target Network ---
+        # With params['target_update'] > 0, next-state Q-values come from a
+        # frozen copy of the weights refreshed every that many steps. The copy
+        # is a plain dict of tensors evaluated with functional_call, so no
+        # second module (optimizer, buffers, compiled forward) is duplicated.
+        # Otherwise current and next states share one forward pass.
+        self.target_update = self.params.get('target_update', 0)
+        self._target_params = None
+        if self.target_update > 0:
+            self._target_params = {name: p.detach().clone()
+                                   for name, p in self.named_parameters()}
+
+        # --- Training Batch Buffers ---
+        # train_step copies each sampled batch into these long-lived buffers
+        # instead of allocating fresh tensors every step.
+        self._alloc_batch_buffers()
+
+        # --- Compiled Forward ---
+        # The training batch has a fixed shape, so on CUDA the forward pass
+        # used by train_step is compiled once ('default' mode, no CUDA graphs).
+        # Only the bound method is compiled; wrapping the module itself would
+        # register it as its own submodule.
+        # The Bellman target is compiled as well so its sub/mul/add run as one
+        # fused elementwise kernel.
+        self._compiled_fwd = None
+        self._bellman = bellman_target
+        if self.device.type == 'cuda':
+            self._compiled_fwd = torch.compile(self.forward, mode='default', fullgraph=False)
+            self._bellman = torch.compile(bellman_target, mode='default')
+            self._warmup_compiled_fwd()
+
+    def _alloc_batch_buffers(self):
+        """
+        Allocates host (pinned on CUDA) and device buffers for one training
+        batch. States are kept as uint8 (they are binary planes) in NHWC
+        layout with the current states in the first half and the next
+        states in the second, so both go through a single forward pass
+        without a torch.cat.
+        On CPU the host buffers double as the device buffers.
+        """
+        max_b = self.params['batch_size']
+        state_shape = (2 * max_b, self.params['width'], self.params['height'], 6)
+        pin = self.device.type == 'cuda'
+
+        def host(shape, dtype=torch.float32):
+            return torch.empty(shape, dtype=dtype, pin_memory=pin)
+
+        self._host_states = host(state_shape, torch.uint8)
+        self._host_a = host((max_b,), torch.long)
+        self._host_t = host((max_b,))
+        self._host_r = host((max_b,))
+
+        if pin:
+            self._dev_states = torch.empty_like(self._host_states, device=self.device)
+            self._dev_a = torch.empty_like(self._host_a, device=self.device)
+            self._dev_t = torch.empty_like(self._host_t, device=self.device)
+            self._dev_r = torch.empty_like(self._host_r, device=self.device)
+            # Marks when the last host -> device copy finished, so the pinned
+            # buffers aren't overwritten while a transfer is still reading them.
+            self._h2d_done = torch.cuda.Event()
+            self._h2d_done.record()
+        else:
+            self._dev_states = self._host_states
+            self._dev_a = self._host_a
+            self._dev_t = self._host_t
+            self._dev_r = self._host_r
+            self._h2d_done = None
+
+    def _stage(self, host, dev, n):
+        """Copies the first n rows of a host buffer to its device buffer."""
+        if dev is not host:
+            dev[:n].copy_(host[:n], non_blocking=True)
+        return dev[:n]
+
+    def _warmup_compiled_fwd(self):
+        """
+        Traces the compiled forward once with a dummy training-shaped batch
+        (current + next states unless a target network is used, same autocast
+        settings as train_step) so the first real training step doesn't pay
+        the compilation cost.
+        """
+        rows = self.params['batch_size']
+        if self._target_params is None:
+            rows *= 2
+        dummy = torch.zeros(
+            (rows, 6, self.params['width'], self.params['height']),
+            device=self.device
+        ).contiguous(memory_format=torch.channels_last)
+        with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                            enabled=self.use_amp):
+            self._compiled_fwd(dummy)
 
     def forward(self, x):
         """
@@ -80,62 +207,112 @@ class DQN(nn.Module):
         x = self.fc4(x) # Output raw Q-values
         return x
 
+    def to_tensor(self, array, dtype=torch.float32):
+        """
+        Converts a numpy array to a tensor of `dtype` on the model's device.
+        The array is transferred in its own dtype and cast on the device, so
+        uint8 states cross the bus at a quarter of the float32 size.
+        This serves single states during action selection, so the host copy
+        is not pinned: page-locking a fresh buffer per call costs more than
+        an async copy of one small state would save.
+        """
+        return torch.as_tensor(array).to(self.device).to(dtype)
+
     def train_step(self, bat_s, bat_a, bat_t, bat_n, bat_r):
         """
         Performs a single training step.
-        All inputs are numpy arrays from the replay memory.
+        All inputs are numpy arrays from the replay memory; bat_a holds
+        integer action indices (0-3).
         """
         
-        # --- 1. Convert NumPy arrays to PyTorch Tensors ---
-        bat_s = torch.from_numpy(bat_s).float()
-        bat_a = torch.from_numpy(bat_a).float()
-        bat_t = torch.from_numpy(bat_t).float()
-        bat_n = torch.from_numpy(bat_n).float()
-        bat_r = torch.from_numpy(bat_r).float()
+        # --- 1. Copy NumPy arrays into the batch buffers on the model's device ---
+        batch_size = bat_s.shape[0]
+        if self._h2d_done is not None:
+            self._h2d_done.synchronize()
+        self._host_states[:batch_size].copy_(torch.as_tensor(bat_s))
+        self._host_states[batch_size:2 * batch_size].copy_(torch.as_tensor(bat_n))
+        self._host_a[:batch_size].copy_(torch.as_tensor(bat_a))
+        self._host_t[:batch_size].copy_(torch.as_tensor(bat_t))
+        self._host_r[:batch_size].copy_(torch.as_tensor(bat_r))
+
+        combined = self._stage(self._host_states, self._dev_states, 2 * batch_size)
+        bat_a = self._stage(self._host_a, self._dev_a, batch_size)
+        bat_t = self._stage(self._host_t, self._dev_t, batch_size)
+        bat_r = self._stage(self._host_r, self._dev_r, batch_size)
+        if self._h2d_done is not None:
+            self._h2d_done.record()
 
         # --- 2. Permute state dimensions ---
+        # Current and next states go through the network as one batch,
+        # which halves the number of kernel launches per training step.
         # The states are [batch, H, W, C]. We need [batch, C, H, W]
-        # for PyTorch's Conv2d layers.
-        bat_s = bat_s.permute(0, 3, 1, 2)
-        bat_n = bat_n.permute(0, 3, 1, 2)
+        # for PyTorch's Conv2d layers. The permuted view of NHWC data is
+        # already channels-last in memory, so this does not copy.
+        # The uint8 planes are only cast to float here, on the device.
+        combined = combined.permute(0, 3, 1, 2).float().contiguous(memory_format=torch.channels_last)
+
+        with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                            enabled=self.use_amp):
+            forward = self._compiled_fwd or self.forward
+            if self._target_params is None:
+                q_all = forward(combined)
+
+                # Q-values for the *current* states (bat_s) keep their gradients;
+                # the *next* state (bat_n) half is detached since the target must
+                # not be backpropagated through.
+                q_pred_all_actions = q_all[:batch_size]
+                q_next = q_all[batch_size:].detach()
+            else:
+                q_pred_all_actions = forward(combined[:batch_size])
+
+                # The target network never needs gradients, so skip autograd
+                # bookkeeping entirely for the *next* states (bat_n)
+                with torch.inference_mode():
+                    q_next = functional_call(self, self._target_params,
+                                             (combined[batch_size:],))
+                # Inference tensors can't be saved for backward by the loss
+                q_next = q_next.clone()
+
+            # --- 3. Calculate Target Q-Values (yj) ---
 
-        # --- 3. Calculate Target Q-Values (yj) ---
-        
-        # Get Q-values for the *next* states (bat_n)
-        # We use torch.no_grad() because we don't need to track gradients
-        # for the target network's calculations.
-        with torch.no_grad():
-            q_next = self.forward(bat_n)
-        
             # The target Q-value (q_t) is the maximum Q-value of the next state
             q_t = torch.max(q_next, dim=1)[0] # dim=1 is the action dimension
-        
+
             # Calculate the Bellman equation target (yj)
             # yj = r + (1-t) * discount * q_t
-            yj = bat_r + (1.0 - bat_t) * self.params['discount'] * q_t
+            yj = self._bellman(bat_r, bat_t, q_t, self.params['discount'])
 
-        # --- 4. Calculate Predicted Q-Values ---
-        
-        # Get Q-values for the *current* states (bat_s)
-        q_pred_all_actions = self.forward(bat_s)
-        
-        # Get the specific Q-value for the action that was *actually* taken (bat_a)
-        # bat_a is one-hot, so (q_pred * bat_a) zeros out all non-taken actions.
-        # torch.sum(..., dim=1) then selects the Q-value for the action we took.
-        q_pred = torch.sum(q_pred_all_actions * bat_a, dim=1)
+            # --- 4. Calculate Predicted Q-Values ---
 
-        # --- 5. Calculate Loss and Perform Update ---
-        
-        # Calculate the loss (MSE) between predicted and target Q-values
-        loss = self.loss_fn(q_pred, yj)
+            # Get the specific Q-value for the action that was *actually* taken (bat_a)
+            # bat_a holds action indices, so gather picks one Q-value per row.
+            q_pred = q_pred_all_actions.gather(1, bat_a.unsqueeze(1)).squeeze(1)
+
+            # --- 5. Calculate Loss and Perform Update ---
 
-        # Standard PyTorch training step
-        self.optimizer.zero_grad() # Clear old gradients
-        loss.backward()            # Calculate new gradients
-        self.optimizer.step()      # Update network weights
+            # Calculate the loss (MSE) between predicted and target Q-values.
+            # Both sides are cast back to FP32 so the loss is computed at full precision.
+            loss = self.loss_fn(q_pred.float(), yj.float())
+
+        # Standard PyTorch training step (the scaler is a no-op unless FP16 is used)
+        self.optimizer.zero_grad(set_to_none=True) # Drop old gradients (no memset)
+        self.scaler.scale(loss).backward()  # Calculate new gradients
+        self.scaler.step(self.optimizer)    # Update network weights
+        self.scaler.update()
 
         self.global_step += 1
-        return self.global_step, loss.item() # .item() gets the scalar value of the loss
+        if self._target_params is not None and self.global_step % self.target_update == 0:
+            self.update_target()
+        # Return the loss as a detached device tensor: calling .item() here
+        # would wait for the GPU on every step. Callers materialize it only
+        # when they actually need the value.
+        return self.global_step, loss.detach()
+
+    @torch.no_grad()
+    def update_target(self):
+        """Copies the current weights into the target network."""
+        for name, p in self.named_parameters():
+            self._target_params[name].copy_(p)
 
     def save_ckpt(self, filename):
         """Saves the model's state dictionary."""
@@ -1,9 +1,26 @@
-from game import Agent, Actions, Directions
-from util import manhattanDistance, Counter, raiseNotDefined
+from game import Agent, Directions
+from util import Counter, raiseNotDefined
 import util
 import random
 
 
+# Unit move vectors, same as Actions.directionToVector.
+_VECS = {
+    Directions.NORTH: (0, 1),
+    Directions.SOUTH: (0, -1),
+    Directions.EAST: (1, 0),
+    Directions.WEST: (-1, 0),
+    Directions.STOP: (0, 0),
+}
+
+# Move vectors pre-scaled for the only two ghost speeds (normal and scared),
+# so getDistribution only does a dict lookup per legal action.
+_SCALED_VECS = {
+    speed: {d: (dx * speed, dy * speed) for d, (dx, dy) in _VECS.items()}
+    for speed in (1, 0.5)
+}
+
+
 class GhostAgent(Agent):
     """
     Base class for all ghost agents.
@@ -65,14 +82,15 @@ class DirectionalGhost(GhostAgent):
         isScared = ghostState.scaredTimer > 0
         speed = 0.5 if isScared else 1
 
-        # Compute new positions for each legal action
-        actionVectors = [Actions.directionToVector(a, speed) for a in legalActions]
-        newPositions = [(pos[0] + dx, pos[1] + dy) for (dx, dy) in actionVectors]
+        x, y = pos
+        px, py = state.getPacmanPosition()
 
-        pacmanPos = state.getPacmanPosition()
-
-        # Compute distances from each new position to Pacman
-        distances = [manhattanDistance(p, pacmanPos) for p in newPositions]
+        # Manhattan distance to Pacman from the new position of each legal action
+        vecs = _SCALED_VECS[speed]
+        distances = []
+        for a in legalActions:
+            dx, dy = vecs[a]
+            distances.append(abs(x + dx - px) + abs(y + dy - py))
 
         # Choose whether to chase or flee
         if isScared:
@@ -82,24 +100,13 @@ class DirectionalGhost(GhostAgent):
             bestScore = min(distances)               # minimize distance when attacking
             chooseProb = self.prob_attack
 
-        # Best actions (either closest or farthest)
-        bestActions = [
-            action for action, dist in zip(legalActions, distances)
-            if dist == bestScore
-        ]
-
-        # Build a distribution over all actions
-        dist = Counter()
-
-        # Assign majority probability to best actions
-        bestCount = len(bestActions)
-        for a in bestActions:
-            dist[a] = chooseProb / bestCount
-
-        # Spread remaining probability uniformly across all legal actions
+        # Majority probability is split over the best actions (either closest
+        # or farthest); the rest is spread uniformly across all legal actions
+        bestProb = chooseProb / distances.count(bestScore)
         remainProb = (1 - chooseProb) / len(legalActions)
-        for a in legalActions:
-            dist[a] += remainProb
 
-        dist.normalize()
+        # One pass over the legal actions; the values already sum to one
+        dist = Counter()
+        for a, d in zip(legalActions, distances):
+            dist[a] = bestProb + remainProb if d == bestScore else remainProb
         return dist
@@ -1,10 +1,14 @@
 from graphicsUtils import (
-    formatColor, colorToVector, sleep, begin_graphics, end_graphics,
-    polygon, square, circle, line, text, changeText, changeColor, refresh,
-    move_by, moveCircle, edit, wait_for_keys, writePostscript, remove_from_screen
+    formatColor, colorToVector, begin_graphics, end_graphics,
+    polygon, square, squares, circle, lines, arcs, text, changeText,
+    changeColors, refresh, batch_updates,
+    move_to, move_by, moveCircle, edit, animate, wait_for_keys,
+    writePostscript, canvasPostscript,
+    remove_from_screen, hide_from_screen, show_on_screen
 )
 import math
-import time
+import os
+from concurrent.futures import ThreadPoolExecutor
 from game import Directions
 
 # Visual constants (kept for compatibility)
@@ -19,14 +23,14 @@ SCORE_COLOR = formatColor(.9, .9, .9)
 PACMAN_OUTLINE_WIDTH = 2
 PACMAN_CAPTURE_OUTLINE_WIDTH = 4
 
-GHOST_COLORS = [
+GHOST_COLORS = (
     formatColor(.9, 0, 0),      # Red
     formatColor(0, .3, .9),     # Blue
     formatColor(.98, .41, .07), # Orange
     formatColor(.1, .75, .7),   # Green
     formatColor(1.0, 0.6, 0.0), # Yellow
     formatColor(.4, 0.13, 0.91) # Purple
-]
+)
 
 TEAM_COLORS = GHOST_COLORS[:2]
 
@@ -44,12 +48,27 @@ GHOST_SHAPE = [
     (-0.25, 0.75)
 ]
 GHOST_SIZE = 0.65
+# How far the eyes look (in ghost units) for each facing direction
+GHOST_EYE_SHIFT = {
+    Directions.NORTH: (0, -0.2),
+    Directions.SOUTH: (0, 0.2),
+    Directions.EAST: (0.2, 0),
+    Directions.WEST: (-0.2, 0),
+}
 SCARED_COLOR = formatColor(1, 1, 1)
+GHOST_EYE_COLOR = formatColor(1.0, 1.0, 1.0)
+GHOST_PUPIL_COLOR = formatColor(0.0, 0.0, 0.0)
 
-GHOST_VEC_COLORS = list(map(colorToVector, GHOST_COLORS))
+GHOST_VEC_COLORS = tuple(tuple(colorToVector(c)) for c in GHOST_COLORS)
 
 PACMAN_COLOR = formatColor(255.0 / 255.0, 255.0 / 255.0, 61.0 / 255)
 PACMAN_SCALE = 0.5
+# Angle (degrees) the mouth opens towards for each facing direction
+PACMAN_MOUTH_ANGLE = {
+    Directions.WEST: 180,
+    Directions.NORTH: 90,
+    Directions.SOUTH: 270,
+}
 
 # Food
 FOOD_COLOR = formatColor(1, 1, 1)
@@ -66,6 +85,13 @@ CAPSULE_SIZE = 0.25
 # Wall rendering radius
 WALL_RADIUS = 0.15
 
+# Neighbor bits used by PacmanGraphics.wallNeighborMasks
+WALL_N, WALL_S, WALL_E, WALL_W = 1, 2, 4, 8
+WALL_NE, WALL_NW, WALL_SE, WALL_SW = 16, 32, 64, 128
+# Wall layout -> neighbor masks, so reinitializing the display for every
+# episode on the same maze doesn't rescan its walls
+WALL_MASK_CACHE = {}
+
 
 # -------------------------
 # Info pane: score & HUD
@@ -143,18 +169,47 @@ class PacmanGraphics:
     def __init__(self, zoom=1.0, frameTime=0.0, capture=False):
         self.have_window = 0
         self.currentGhostImages = {}
+        self.ghostBodyColors = {}
+        self.wallOpTable = {}  # neighbor mask -> getWallOps result
         self.pacmanImage = None
         self.zoom = zoom
         self.gridSize = DEFAULT_GRID_SIZE * zoom
         self.capture = capture
         self.frameTime = frameTime
+        # With PACMAN_NO_RENDER=1 and no frame delay (e.g. a training run
+        # that forgot -q), behave as a null display and draw nothing.
+        self.renderEnabled = not (frameTime == 0 and os.environ.get('PACMAN_NO_RENDER') == '1')
+
+        # Ghost geometry depends only on the grid size, so scale it once
+        # instead of on every draw/move.
+        unit = self.gridSize * GHOST_SIZE
+        # kept as separate x / y columns so placing a ghost is two flat adds
+        self.ghostShapeXs = [x * unit for (x, _) in GHOST_SHAPE]
+        self.ghostShapeYs = [y * unit for (_, y) in GHOST_SHAPE]
+        self.ghostEyeRadius = unit * 0.2
+        self.ghostPupilRadius = unit * 0.08
+        # direction -> (leftEye, rightEye, leftPupil, rightPupil) offsets
+        # from the ghost's screen position
+        self.ghostEyeOffsets = {}
+        for direction in (Directions.NORTH, Directions.SOUTH, Directions.EAST,
+                          Directions.WEST, Directions.STOP):
+            dx, dy = GHOST_EYE_SHIFT.get(direction, (0, 0))
+            self.ghostEyeOffsets[direction] = (
+                (unit * (-0.3 + dx / 1.5), unit * (0.3 - dy / 1.5)),
+                (unit * (0.3 + dx / 1.5), unit * (0.3 - dy / 1.5)),
+                (unit * (-0.3 + dx), unit * (0.3 - dy)),
+                (unit * (0.3 + dx), unit * (0.3 - dy)),
+            )
 
     def checkNullDisplay(self):
-        return False
+        return not self.renderEnabled
 
     def initialize(self, state, isBlue=False):
         """Initialize graphics and draw static + dynamic objects."""
         self.isBlue = isBlue
+        if not self.renderEnabled:
+            self.previousState = state
+            return
         self.startGraphics(state)
         self.distributionImages = None  # built lazily
         self.drawStaticObjects(state)
@@ -171,16 +226,13 @@ class PacmanGraphics:
         self.currentState = layout
 
     def drawDistributions(self, state):
+        """Draw one background square per cell, all in a single batched call."""
         walls = state.layout.walls
-        dist = []
-        for x in range(walls.width):
-            distx = []
-            dist.append(distx)
-            for y in range(walls.height):
-                screen_x, screen_y = self.to_screen((x, y))
-                block = square((screen_x, screen_y), 0.5 * self.gridSize, color=BACKGROUND_COLOR, filled=1, behind=2)
-                distx.append(block)
-        self.distributionImages = dist
+        r = 0.5 * self.gridSize
+        ids = squares([(self.to_screen((x, y)), r, BACKGROUND_COLOR)
+                       for x in range(walls.width) for y in range(walls.height)], behind=2)
+        h = walls.height
+        self.distributionImages = [ids[x * h:(x + 1) * h] for x in range(walls.width)]
 
     def drawStaticObjects(self, state):
         layout = self.layout
@@ -192,6 +244,11 @@ class PacmanGraphics:
     def drawAgentObjects(self, state):
         # Build agentImages list of (agentState, imageParts)
         self.agentImages = []
+        # (agentIndex, isPacman) -> hidden imageParts kept for swapImages
+        self.spareImages = {}
+        # ghost body item -> color it was last drawn with; canvas ids
+        # restart with each new window, so this resets with the images
+        self.ghostBodyColors = {}
         for index, agent in enumerate(state.agentStates):
             if agent.isPacman:
                 image = self.drawPacman(agent, index)
@@ -201,42 +258,62 @@ class PacmanGraphics:
         refresh()
 
     def swapImages(self, agentIndex, newState):
-        """Swap a ghost image into a pacman image (capture) or vice versa."""
+        """
+        Swap a ghost image into a pacman image (capture) or vice versa.
+        The outgoing image is hidden and kept, so swapping back reuses its
+        canvas items instead of deleting and recreating them.
+        """
         prevState, prevImage = self.agentImages[agentIndex]
         for item in prevImage:
-            remove_from_screen(item)
-        if newState.isPacman:
-            image = self.drawPacman(newState, agentIndex)
+            hide_from_screen(item)
+        self.spareImages[(agentIndex, prevState.isPacman)] = prevImage
+
+        image = self.spareImages.pop((agentIndex, newState.isPacman), None)
+        if image is None:
+            if newState.isPacman:
+                image = self.drawPacman(newState, agentIndex)
+            else:
+                image = self.drawGhost(newState, agentIndex)
         else:
-            image = self.drawGhost(newState, agentIndex)
+            for item in image:
+                show_on_screen(item)
+            if newState.isPacman:
+                self.movePacman(self.getPosition(newState), self.getDirection(newState), image)
+            else:
+                self.placeGhost(newState, agentIndex, image)
         self.agentImages[agentIndex] = (newState, image)
         refresh()
 
     def update(self, newState):
         """Update visuals for the agent that just moved and other changes."""
-        agentIndex = newState._agentMoved
-        agentState = newState.agentStates[agentIndex]
-
-        # Swap if type changed (ghost -> pacman or vice versa)
-        if self.agentImages[agentIndex][0].isPacman != agentState.isPacman:
-            self.swapImages(agentIndex, agentState)
-
-        prevState, prevImage = self.agentImages[agentIndex]
-        if agentState.isPacman:
-            self.animatePacman(agentState, prevState, prevImage)
-        else:
-            self.moveGhost(agentState, agentIndex, prevState, prevImage)
+        if not self.renderEnabled:
+            return
+        # Everything below redraws once, when the block exits, rather than
+        # after every individual move.
+        with batch_updates():
+            agentIndex = newState._agentMoved
+            agentState = newState.agentStates[agentIndex]
+
+            # Swap if type changed (ghost -> pacman or vice versa)
+            if self.agentImages[agentIndex][0].isPacman != agentState.isPacman:
+                self.swapImages(agentIndex, agentState)
+
+            prevState, prevImage = self.agentImages[agentIndex]
+            if agentState.isPacman:
+                self.animatePacman(agentState, prevState, prevImage)
+            else:
+                self.moveGhost(agentState, agentIndex, prevState, prevImage)
 
-        self.agentImages[agentIndex] = (agentState, prevImage)
+            self.agentImages[agentIndex] = (agentState, prevImage)
 
-        if newState._foodEaten is not None:
-            self.removeFood(newState._foodEaten, self.food)
-        if newState._capsuleEaten is not None:
-            self.removeCapsule(newState._capsuleEaten, self.capsules)
+            if newState._foodEaten is not None:
+                self.removeFood(newState._foodEaten, self.food)
+            if newState._capsuleEaten is not None:
+                self.removeCapsule(newState._capsuleEaten, self.capsules)
 
-        self.infoPane.updateScore(newState.score)
-        if hasattr(newState, "ghostDistances"):
-            self.infoPane.updateGhostDistances(newState.ghostDistances)
+            self.infoPane.updateScore(newState.score)
+            if hasattr(newState, "ghostDistances"):
+                self.infoPane.updateGhostDistances(newState.ghostDistances)
 
     def make_window(self, width, height):
         grid_width = (width - 1) * self.gridSize
@@ -272,15 +349,8 @@ class PacmanGraphics:
         pos = (x - int(x)) + (y - int(y))
         width = 30 + 80 * math.sin(math.pi * pos)
         delta = width / 2
-        if direction == 'West':
-            endpoints = (180 + delta, 180 - delta)
-        elif direction == 'North':
-            endpoints = (90 + delta, 90 - delta)
-        elif direction == 'South':
-            endpoints = (270 + delta, 270 - delta)
-        else:  # East / Stop default
-            endpoints = (0 + delta, 0 - delta)
-        return endpoints
+        center = PACMAN_MOUTH_ANGLE.get(direction, 0)  # East / Stop default
+        return (center + delta, center - delta)
 
     def movePacman(self, position, direction, image):
         screenPosition = self.to_screen(position)
@@ -298,16 +368,23 @@ class PacmanGraphics:
                 self.frameTime = 0.1
 
         if self.frameTime > 0.01 or self.frameTime < 0:
-            start = time.time()
             fx, fy = self.getPosition(prevPacman)
             px, py = self.getPosition(pacman)
+            direction = self.getDirection(pacman)
+            r = PACMAN_SCALE * self.gridSize
             frames = 4.0
+
+            def frame(pos):
+                # Tk repaints between scheduled frames, so no refresh here
+                return lambda: moveCircle(image[0], self.to_screen(pos), r,
+                                          self.getEndpoints(direction, pos))
+
+            steps = []
             for i in range(1, int(frames) + 1):
                 pos = (px * i / frames + fx * (frames - i) / frames,
                        py * i / frames + fy * (frames - i) / frames)
-                self.movePacman(pos, self.getDirection(pacman), image)
-                refresh()
-                sleep(abs(self.frameTime) / frames)
+                steps.append(frame(pos))
+            animate(steps, abs(self.frameTime) / frames)
         else:
             self.movePacman(self.getPosition(pacman), self.getDirection(pacman), image)
         refresh()
@@ -318,82 +395,83 @@ class PacmanGraphics:
     def getGhostColor(self, ghost, ghostIndex):
         return SCARED_COLOR if ghost.scaredTimer > 0 else GHOST_COLORS[ghostIndex]
 
+    def getEyePositions(self, screen_x, screen_y, direction):
+        """Return screen centers of (leftEye, rightEye, leftPupil, rightPupil)."""
+        offsets = self.ghostEyeOffsets.get(direction)
+        if offsets is None:
+            offsets = self.ghostEyeOffsets[Directions.STOP]
+        return [(screen_x + ox, screen_y - oy) for (ox, oy) in offsets]
+
     def drawGhost(self, ghost, agentIndex):
         pos = self.getPosition(ghost)
         direction = self.getDirection(ghost)
         screen_x, screen_y = self.to_screen(pos)
-        coords = [(x * self.gridSize * GHOST_SIZE + screen_x, y * self.gridSize * GHOST_SIZE + screen_y)
-                  for (x, y) in GHOST_SHAPE]
+        coords = list(zip([x + screen_x for x in self.ghostShapeXs],
+                          [y + screen_y for y in self.ghostShapeYs]))
 
         colour = self.getGhostColor(ghost, agentIndex)
         body = polygon(coords, colour, filled=1)
-        WHITE = formatColor(1.0, 1.0, 1.0)
-        BLACK = formatColor(0.0, 0.0, 0.0)
-
-        dx = dy = 0
-        if direction == 'North':
-            dy = -0.2
-        elif direction == 'South':
-            dy = 0.2
-        elif direction == 'East':
-            dx = 0.2
-        elif direction == 'West':
-            dx = -0.2
-
-        leftEye = circle((screen_x + self.gridSize * GHOST_SIZE * (-0.3 + dx / 1.5),
-                           screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy / 1.5)),
-                          self.gridSize * GHOST_SIZE * 0.2, WHITE, WHITE)
-        rightEye = circle((screen_x + self.gridSize * GHOST_SIZE * (0.3 + dx / 1.5),
-                            screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy / 1.5)),
-                           self.gridSize * GHOST_SIZE * 0.2, WHITE, WHITE)
-        leftPupil = circle((screen_x + self.gridSize * GHOST_SIZE * (-0.3 + dx),
-                             screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy)),
-                            self.gridSize * GHOST_SIZE * 0.08, BLACK, BLACK)
-        rightPupil = circle((screen_x + self.gridSize * GHOST_SIZE * (0.3 + dx),
-                              screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy)),
-                             self.gridSize * GHOST_SIZE * 0.08, BLACK, BLACK)
+        self.ghostBodyColors[body] = colour
+
+        leftEyePos, rightEyePos, leftPupilPos, rightPupilPos = \
+            self.getEyePositions(screen_x, screen_y, direction)
+        leftEye, rightEye = arcs([(leftEyePos, self.ghostEyeRadius, None),
+                                  (rightEyePos, self.ghostEyeRadius, None)],
+                                 GHOST_EYE_COLOR, GHOST_EYE_COLOR)
+        leftPupil, rightPupil = arcs([(leftPupilPos, self.ghostPupilRadius, None),
+                                      (rightPupilPos, self.ghostPupilRadius, None)],
+                                     GHOST_PUPIL_COLOR, GHOST_PUPIL_COLOR)
 
         ghostImageParts = [body, leftEye, rightEye, leftPupil, rightPupil]
         return ghostImageParts
 
     def moveEyes(self, pos, direction, eyes):
         screen_x, screen_y = self.to_screen(pos)
-        dx = dy = 0
-        if direction == 'North':
-            dy = -0.2
-        elif direction == 'South':
-            dy = 0.2
-        elif direction == 'East':
-            dx = 0.2
-        elif direction == 'West':
-            dx = -0.2
-
-        moveCircle(eyes[0], (screen_x + self.gridSize * GHOST_SIZE * (-0.3 + dx / 1.5),
-                             screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy / 1.5)),
-                   self.gridSize * GHOST_SIZE * 0.2)
-        moveCircle(eyes[1], (screen_x + self.gridSize * GHOST_SIZE * (0.3 + dx / 1.5),
-                             screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy / 1.5)),
-                   self.gridSize * GHOST_SIZE * 0.2)
-        moveCircle(eyes[2], (screen_x + self.gridSize * GHOST_SIZE * (-0.3 + dx),
-                             screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy)),
-                   self.gridSize * GHOST_SIZE * 0.08)
-        moveCircle(eyes[3], (screen_x + self.gridSize * GHOST_SIZE * (0.3 + dx),
-                             screen_y - self.gridSize * GHOST_SIZE * (0.3 - dy)),
-                   self.gridSize * GHOST_SIZE * 0.08)
+        positions = self.getEyePositions(screen_x, screen_y, direction)
+        radii = (self.ghostEyeRadius, self.ghostEyeRadius,
+                 self.ghostPupilRadius, self.ghostPupilRadius)
+        for eye, eyePos, r in zip(eyes, positions, radii):
+            moveCircle(eye, eyePos, r)
+
+    def placeGhost(self, ghost, ghostIndex, ghostImageParts):
+        """Reposition and recolor existing ghost parts as drawGhost would draw them."""
+        pos = self.getPosition(ghost)
+        screen_x, screen_y = self.to_screen(pos)
+        move_to(ghostImageParts[0], screen_x + self.ghostShapeXs[0], screen_y + self.ghostShapeYs[0])
+        self.setGhostColor(ghostImageParts[0], self.getGhostColor(ghost, ghostIndex))
+        self.moveEyes(pos, self.getDirection(ghost), ghostImageParts[-4:])
+
+    def setGhostColor(self, body, color):
+        """
+        Recolor a ghost body, skipping the canvas call if it already has that
+        color. Returns True if the color was changed.
+        """
+        if self.ghostBodyColors.get(body) == color:
+            return False
+        edit(body, ('fill', color), ('outline', color))
+        self.ghostBodyColors[body] = color
+        return True
 
     def moveGhost(self, ghost, ghostIndex, prevGhost, ghostImageParts):
         old_x, old_y = self.to_screen(self.getPosition(prevGhost))
         new_x, new_y = self.to_screen(self.getPosition(ghost))
         delta = (new_x - old_x, new_y - old_y)
+        direction = self.getDirection(ghost)
 
-        for part in ghostImageParts:
-            move_by(part, delta)
-        refresh()
+        # A ghost that stopped in place facing the same way only needs
+        # its (possibly scared) color checked.
+        moved = delta != (0, 0) or direction != self.getDirection(prevGhost)
+        if moved:
+            for part in ghostImageParts:
+                move_by(part, delta)
+            refresh()
 
         color = SCARED_COLOR if ghost.scaredTimer > 0 else GHOST_COLORS[ghostIndex]
-        edit(ghostImageParts[0], ('fill', color), ('outline', color))
-        self.moveEyes(self.getPosition(ghost), self.getDirection(ghost), ghostImageParts[-4:])
-        refresh()
+        recolored = self.setGhostColor(ghostImageParts[0], color)
+        if moved:
+            self.moveEyes(self.getPosition(ghost), direction, ghostImageParts[-4:])
+        if moved or recolored:
+            refresh()
 
     # -------------------------
     # Basic helpers
@@ -409,7 +487,9 @@ class PacmanGraphics:
         return agentState.configuration.getDirection()
 
     def finish(self):
-        end_graphics()
+        flushFrames()
+        if self.renderEnabled:
+            end_graphics()
 
     def to_screen(self, point):
         """Map grid (x,y) to screen coordinates for drawing objects."""
@@ -423,98 +503,161 @@ class PacmanGraphics:
         return self.to_screen(point)
 
     def drawWalls(self, wallMatrix):
-        """Draw complex walls with rounded corners depending on neighbors."""
-        wallColor = WALL_COLOR
-        for xNum, column in enumerate(wallMatrix):
-            if self.capture and (xNum * 2) < wallMatrix.width:
-                wallColor = TEAM_COLORS[0]
-            if self.capture and (xNum * 2) >= wallMatrix.width:
-                wallColor = TEAM_COLORS[1]
-
-            for yNum, cell in enumerate(column):
-                if not cell:
+        """
+        Draw complex walls with rounded corners depending on neighbors.
+        Segments and corner arcs are collected per color and submitted to
+        the canvas in one batched call each, rather than one call per piece.
+        """
+        masks = self.wallNeighborMasks(wallMatrix)
+        segments = {}  # color -> [(here, there), ...]
+        corners = {}   # color -> [(pos, r, endpoints), ...]
+        columnColors = self.getColumnColors(wallMatrix.width, WALL_COLOR)
+        for xNum, wallColor in enumerate(columnColors):
+            wallLines = segments.setdefault(wallColor, [])
+            wallArcs = corners.setdefault(wallColor, [])
+
+            for yNum, mask in enumerate(masks[xNum]):
+                if mask is None:
+                    continue
+                sx, sy = self.to_screen((xNum, yNum))
+                arcOps, lineOps = self.getWallOps(mask)
+                for (ox, oy), r, endpoints in arcOps:
+                    wallArcs.append(((sx + ox, sy + oy), r, endpoints))
+                for (ax, ay), (bx, by) in lineOps:
+                    wallLines.append(((sx + ax, sy + ay), (sx + bx, sy + by)))
+
+        for color, specs in corners.items():
+            arcs(specs, color, color, 'arc')
+        for color, segs in segments.items():
+            lines(segs, color)
+
+    def getWallOps(self, mask):
+        """
+        Return (arcOps, lineOps) for a wall cell with the given neighbor mask:
+        the corner arcs [(offset, r, endpoints), ...] and line segments
+        [(start, end), ...] to draw, as offsets from the cell's screen
+        position. There are only 256 masks, so each is worked out once per
+        grid size and reused for every cell that shares it.
+        """
+        ops = self.wallOpTable.get(mask)
+        if ops is not None:
+            return ops
+
+        wIsWall = mask & WALL_W
+        eIsWall = mask & WALL_E
+        nIsWall = mask & WALL_N
+        sIsWall = mask & WALL_S
+        nwIsWall = mask & WALL_NW
+        swIsWall = mask & WALL_SW
+        neIsWall = mask & WALL_NE
+        seIsWall = mask & WALL_SE
+
+        arcOps = []
+        lineOps = []
+
+        # NE quadrant
+        if (not nIsWall) and (not eIsWall):
+            arcOps.append(((0, 0), WALL_RADIUS * self.gridSize, (0, 91)))
+        if (nIsWall) and (not eIsWall):
+            lineOps.append(((self.gridSize * WALL_RADIUS, 0),
+                            (self.gridSize * WALL_RADIUS, self.gridSize * (-0.5) - 1)))
+        if (not nIsWall) and (eIsWall):
+            lineOps.append(((0, self.gridSize * (-1) * WALL_RADIUS),
+                            (self.gridSize * 0.5 + 1, self.gridSize * (-1) * WALL_RADIUS)))
+        if (nIsWall) and (eIsWall) and (not neIsWall):
+            arcOps.append(((self.gridSize * 2 * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS),
+                           WALL_RADIUS * self.gridSize - 1, (180, 271)))
+            lineOps.append(((self.gridSize * 2 * WALL_RADIUS - 1, self.gridSize * (-1) * WALL_RADIUS),
+                            (self.gridSize * 0.5 + 1, self.gridSize * (-1) * WALL_RADIUS)))
+            lineOps.append(((self.gridSize * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS + 1),
+                            (self.gridSize * WALL_RADIUS, self.gridSize * (-0.5))))
+
+        # NW quadrant
+        if (not nIsWall) and (not wIsWall):
+            arcOps.append(((0, 0), WALL_RADIUS * self.gridSize, (90, 181)))
+        if (nIsWall) and (not wIsWall):
+            lineOps.append(((self.gridSize * (-1) * WALL_RADIUS, 0),
+                            (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-0.5) - 1)))
+        if (not nIsWall) and (wIsWall):
+            lineOps.append(((0, self.gridSize * (-1) * WALL_RADIUS),
+                            (self.gridSize * (-0.5) - 1, self.gridSize * (-1) * WALL_RADIUS)))
+        if (nIsWall) and (wIsWall) and (not nwIsWall):
+            arcOps.append(((self.gridSize * (-2) * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS),
+                           WALL_RADIUS * self.gridSize - 1, (270, 361)))
+            lineOps.append(((self.gridSize * (-2) * WALL_RADIUS + 1, self.gridSize * (-1) * WALL_RADIUS),
+                            (self.gridSize * (-0.5), self.gridSize * (-1) * WALL_RADIUS)))
+            lineOps.append(((self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS + 1),
+                            (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-0.5))))
+
+        # SE quadrant
+        if (not sIsWall) and (not eIsWall):
+            arcOps.append(((0, 0), WALL_RADIUS * self.gridSize, (270, 361)))
+        if (sIsWall) and (not eIsWall):
+            lineOps.append(((self.gridSize * WALL_RADIUS, 0),
+                            (self.gridSize * WALL_RADIUS, self.gridSize * (0.5) + 1)))
+        if (not sIsWall) and (eIsWall):
+            lineOps.append(((0, self.gridSize * (1) * WALL_RADIUS),
+                            (self.gridSize * 0.5 + 1, self.gridSize * (1) * WALL_RADIUS)))
+        if (sIsWall) and (eIsWall) and (not seIsWall):
+            arcOps.append(((self.gridSize * 2 * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS),
+                           WALL_RADIUS * self.gridSize - 1, (90, 181)))
+            lineOps.append(((self.gridSize * 2 * WALL_RADIUS - 1, self.gridSize * (1) * WALL_RADIUS),
+                            (self.gridSize * 0.5, self.gridSize * (1) * WALL_RADIUS)))
+            lineOps.append(((self.gridSize * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS - 1),
+                            (self.gridSize * WALL_RADIUS, self.gridSize * (0.5))))
+
+        # SW quadrant
+        if (not sIsWall) and (not wIsWall):
+            arcOps.append(((0, 0), WALL_RADIUS * self.gridSize, (180, 271)))
+        if (sIsWall) and (not wIsWall):
+            lineOps.append(((self.gridSize * (-1) * WALL_RADIUS, 0),
+                            (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (0.5) + 1)))
+        if (not sIsWall) and (wIsWall):
+            lineOps.append(((0, self.gridSize * (1) * WALL_RADIUS),
+                            (self.gridSize * (-0.5) - 1, self.gridSize * (1) * WALL_RADIUS)))
+        if (sIsWall) and (wIsWall) and (not swIsWall):
+            arcOps.append(((self.gridSize * (-2) * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS),
+                           WALL_RADIUS * self.gridSize - 1, (0, 91)))
+            lineOps.append(((self.gridSize * (-2) * WALL_RADIUS + 1, self.gridSize * (1) * WALL_RADIUS),
+                            (self.gridSize * (-0.5), self.gridSize * (1) * WALL_RADIUS)))
+            lineOps.append(((self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS - 1),
+                            (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (0.5))))
+
+        ops = self.wallOpTable[mask] = (arcOps, lineOps)
+        return ops
+
+    def wallNeighborMasks(self, walls):
+        """
+        Return a width x height list of neighbor bitmasks (WALL_* flags) for
+        every wall cell, and None for open cells. The grid is padded with a
+        border of open cells once so no lookup needs a bounds check.
+        Results are cached per wall layout in WALL_MASK_CACHE.
+        """
+        key = tuple(tuple(column) for column in walls)
+        if key in WALL_MASK_CACHE:
+            return WALL_MASK_CACHE[key]
+
+        blank = [False] * (walls.height + 2)
+        padded = [blank] + [[False] + list(column) + [False] for column in walls] + [blank]
+        masks = []
+        for x in range(1, walls.width + 1):
+            west, here, east = padded[x - 1], padded[x], padded[x + 1]
+            column = []
+            for y in range(1, walls.height + 1):
+                if not here[y]:
+                    column.append(None)
                     continue
-                pos = (xNum, yNum)
-                screen = self.to_screen(pos)
-                screen2 = self.to_screen2(pos)
-
-                # neighbors
-                wIsWall = self.isWall(xNum - 1, yNum, wallMatrix)
-                eIsWall = self.isWall(xNum + 1, yNum, wallMatrix)
-                nIsWall = self.isWall(xNum, yNum + 1, wallMatrix)
-                sIsWall = self.isWall(xNum, yNum - 1, wallMatrix)
-                nwIsWall = self.isWall(xNum - 1, yNum + 1, wallMatrix)
-                swIsWall = self.isWall(xNum - 1, yNum - 1, wallMatrix)
-                neIsWall = self.isWall(xNum + 1, yNum + 1, wallMatrix)
-                seIsWall = self.isWall(xNum + 1, yNum - 1, wallMatrix)
-
-                # NE quadrant
-                if (not nIsWall) and (not eIsWall):
-                    circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (0, 91), 'arc')
-                if (nIsWall) and (not eIsWall):
-                    line(add(screen, (self.gridSize * WALL_RADIUS, 0)),
-                         add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (-0.5) - 1)), wallColor)
-                if (not nIsWall) and (eIsWall):
-                    line(add(screen, (0, self.gridSize * (-1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * 0.5 + 1, self.gridSize * (-1) * WALL_RADIUS)), wallColor)
-                if (nIsWall) and (eIsWall) and (not neIsWall):
-                    circle(add(screen2, (self.gridSize * 2 * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS)),
-                           WALL_RADIUS * self.gridSize - 1, wallColor, wallColor, (180, 271), 'arc')
-                    line(add(screen, (self.gridSize * 2 * WALL_RADIUS - 1, self.gridSize * (-1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * 0.5 + 1, self.gridSize * (-1) * WALL_RADIUS)), wallColor)
-                    line(add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS + 1)),
-                         add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (-0.5))), wallColor)
-
-                # NW quadrant
-                if (not nIsWall) and (not wIsWall):
-                    circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (90, 181), 'arc')
-                if (nIsWall) and (not wIsWall):
-                    line(add(screen, (self.gridSize * (-1) * WALL_RADIUS, 0)),
-                         add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-0.5) - 1)), wallColor)
-                if (not nIsWall) and (wIsWall):
-                    line(add(screen, (0, self.gridSize * (-1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * (-0.5) - 1, self.gridSize * (-1) * WALL_RADIUS)), wallColor)
-                if (nIsWall) and (wIsWall) and (not nwIsWall):
-                    circle(add(screen2, (self.gridSize * (-2) * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS)),
-                           WALL_RADIUS * self.gridSize - 1, wallColor, wallColor, (270, 361), 'arc')
-                    line(add(screen, (self.gridSize * (-2) * WALL_RADIUS + 1, self.gridSize * (-1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * (-0.5), self.gridSize * (-1) * WALL_RADIUS)), wallColor)
-                    line(add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-2) * WALL_RADIUS + 1)),
-                         add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (-0.5))), wallColor)
-
-                # SE quadrant
-                if (not sIsWall) and (not eIsWall):
-                    circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (270, 361), 'arc')
-                if (sIsWall) and (not eIsWall):
-                    line(add(screen, (self.gridSize * WALL_RADIUS, 0)),
-                         add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (0.5) + 1)), wallColor)
-                if (not sIsWall) and (eIsWall):
-                    line(add(screen, (0, self.gridSize * (1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * 0.5 + 1, self.gridSize * (1) * WALL_RADIUS)), wallColor)
-                if (sIsWall) and (eIsWall) and (not seIsWall):
-                    circle(add(screen2, (self.gridSize * 2 * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS)),
-                           WALL_RADIUS * self.gridSize - 1, wallColor, wallColor, (90, 181), 'arc')
-                    line(add(screen, (self.gridSize * 2 * WALL_RADIUS - 1, self.gridSize * (1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * 0.5, self.gridSize * (1) * WALL_RADIUS)), wallColor)
-                    line(add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS - 1)),
-                         add(screen, (self.gridSize * WALL_RADIUS, self.gridSize * (0.5))), wallColor)
-
-                # SW quadrant
-                if (not sIsWall) and (not wIsWall):
-                    circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (180, 271), 'arc')
-                if (sIsWall) and (not wIsWall):
-                    line(add(screen, (self.gridSize * (-1) * WALL_RADIUS, 0)),
-                         add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (0.5) + 1)), wallColor)
-                if (not sIsWall) and (wIsWall):
-                    line(add(screen, (0, self.gridSize * (1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * (-0.5) - 1, self.gridSize * (1) * WALL_RADIUS)), wallColor)
-                if (sIsWall) and (wIsWall) and (not swIsWall):
-                    circle(add(screen2, (self.gridSize * (-2) * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS)),
-                           WALL_RADIUS * self.gridSize - 1, wallColor, wallColor, (0, 91), 'arc')
-                    line(add(screen, (self.gridSize * (-2) * WALL_RADIUS + 1, self.gridSize * (1) * WALL_RADIUS)),
-                         add(screen, (self.gridSize * (-0.5), self.gridSize * (1) * WALL_RADIUS)), wallColor)
-                    line(add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (2) * WALL_RADIUS - 1)),
-                         add(screen, (self.gridSize * (-1) * WALL_RADIUS, self.gridSize * (0.5))), wallColor)
+                column.append((WALL_N if here[y + 1] else 0) |
+                              (WALL_S if here[y - 1] else 0) |
+                              (WALL_E if east[y] else 0) |
+                              (WALL_W if west[y] else 0) |
+                              (WALL_NE if east[y + 1] else 0) |
+                              (WALL_NW if west[y + 1] else 0) |
+                              (WALL_SE if east[y - 1] else 0) |
+                              (WALL_SW if west[y - 1] else 0))
+            masks.append(column)
+        WALL_MASK_CACHE[key] = masks
+        return masks
 
     def isWall(self, x, y, walls):
         """Check bounds and whether cell is a wall."""
@@ -524,39 +667,46 @@ class PacmanGraphics:
             return False
         return walls[x][y]
 
+    def getColumnColors(self, width, color, midlineHome=False):
+        """
+        Return one color per column: `color`, or in capture mode the two team
+        colors split down the middle. On even-width mazes the column at
+        width / 2 goes to the first team with midlineHome (as food is drawn)
+        and to the second team otherwise (as walls are drawn).
+        """
+        if not self.capture:
+            return [color] * width
+        if midlineHome:
+            return [TEAM_COLORS[0] if x * 2 <= width else TEAM_COLORS[1] for x in range(width)]
+        return [TEAM_COLORS[0] if x * 2 < width else TEAM_COLORS[1] for x in range(width)]
+
     def drawFood(self, foodMatrix):
-        """Draw all food dots and return list-of-lists of image ids (or None)."""
-        foodImages = []
-        color = FOOD_COLOR
-        for xNum, column in enumerate(foodMatrix):
-            if self.capture and (xNum * 2) <= foodMatrix.width:
-                color = TEAM_COLORS[0]
-            if self.capture and (xNum * 2) > foodMatrix.width:
-                color = TEAM_COLORS[1]
-            imageRow = []
-            foodImages.append(imageRow)
-            for yNum, cell in enumerate(column):
-                if cell:
-                    screen = self.to_screen((xNum, yNum))
-                    dot = circle(screen, FOOD_SIZE * self.gridSize, outlineColor=color, fillColor=color, width=1)
-                    imageRow.append(dot)
-                else:
-                    imageRow.append(None)
+        """
+        Draw all food dots and return a dict (x, y) -> image id.
+        Dots are grouped by color and each group is created in one batched call.
+        """
+        foodImages = {}
+        dots = {}  # color -> [(x, y), ...]
+        columnColors = self.getColumnColors(foodMatrix.width, FOOD_COLOR, midlineHome=True)
+        for xNum, (column, color) in enumerate(zip(foodMatrix, columnColors)):
+            cells = dots.setdefault(color, [])
+            cells.extend((xNum, yNum) for yNum, cell in enumerate(column) if cell)
+
+        r = FOOD_SIZE * self.gridSize
+        for color, cells in dots.items():
+            ids = arcs([(self.to_screen(cell), r, None) for cell in cells], color, color, width=1)
+            foodImages.update(zip(cells, ids))
         return foodImages
 
     def drawCapsules(self, capsules):
-        """Draw capsules and return dict position->image."""
-        capsuleImages = {}
-        for capsule in capsules:
-            screen_x, screen_y = self.to_screen(capsule)
-            dot = circle((screen_x, screen_y), CAPSULE_SIZE * self.gridSize,
-                         outlineColor=CAPSULE_COLOR, fillColor=CAPSULE_COLOR, width=1)
-            capsuleImages[capsule] = dot
-        return capsuleImages
+        """Draw capsules in one batched call and return dict position->image."""
+        r = CAPSULE_SIZE * self.gridSize
+        ids = arcs([(self.to_screen(capsule), r, None) for capsule in capsules],
+                   CAPSULE_COLOR, CAPSULE_COLOR, width=1)
+        return dict(zip(capsules, ids))
 
     def removeFood(self, cell, foodImages):
-        x, y = cell
-        remove_from_screen(foodImages[x][y])
+        remove_from_screen(foodImages.pop(cell))
 
     def removeCapsule(self, cell, capsuleImages):
         x, y = cell
@@ -571,13 +721,18 @@ class PacmanGraphics:
         baseColor = [1.0, 0.0, 0.0]
         self.clearExpandedCells()
         self.expandedCells = []
-        for k, cell in enumerate(cells):
-            screenPos = self.to_screen(cell)
-            cellColor = formatColor(*[(n - k) * c * .5 / n + .25 for c in baseColor])
-            block = square(screenPos, 0.5 * self.gridSize, color=cellColor, filled=1, behind=2)
-            self.expandedCells.append(block)
-            if self.frameTime < 0:
+        r = 0.5 * self.gridSize
+        specs = [(self.to_screen(cell), r,
+                  formatColor(*[(n - k) * c * .5 / n + .25 for c in baseColor]))
+                 for k, cell in enumerate(cells)]
+        if self.frameTime < 0:
+            # stepping through by hand: show the cells appearing one by one
+            for screenPos, r, cellColor in specs:
+                block = square(screenPos, r, color=cellColor, filled=1, behind=2)
+                self.expandedCells.append(block)
                 refresh()
+        else:
+            self.expandedCells = squares(specs, behind=2)
 
     def clearExpandedCells(self):
         if hasattr(self, "expandedCells") and len(self.expandedCells) > 0:
@@ -586,22 +741,29 @@ class PacmanGraphics:
 
     def updateDistributions(self, distributions):
         """Render belief distributions (agent position probabilities)."""
+        if not self.renderEnabled:
+            return
         distributions = [x.copy() for x in distributions]
         if self.distributionImages is None:
             self.drawDistributions(self.previousState)
-        for x in range(len(self.distributionImages)):
-            for y in range(len(self.distributionImages[0])):
-                image = self.distributionImages[x][y]
-                weights = [dist[(x, y)] for dist in distributions]
-
-                # compute color blend
-                color = [0.0, 0.0, 0.0]
-                colors = GHOST_VEC_COLORS[1:]
-                if self.capture:
-                    colors = GHOST_VEC_COLORS
-                for weight, gcolor in zip(weights, colors):
-                    color = [min(1.0, c + 0.95 * g * weight ** .3) for c, g in zip(color, gcolor)]
-                changeColor(image, formatColor(*color))
+        colors = GHOST_VEC_COLORS if self.capture else GHOST_VEC_COLORS[1:]
+        # fold the 0.95 blend factor into each ghost's color once
+        scaled = [[0.95 * g for g in gcolor] for gcolor in colors]
+        changes = []
+        for x, column in enumerate(self.distributionImages):
+            for y, image in enumerate(column):
+                # compute color blend; every term is non-negative, so
+                # clamping the sum once matches clamping after each ghost
+                r = g = b = 0.0
+                for dist, (sr, sg, sb) in zip(distributions, scaled):
+                    weight = dist[(x, y)]
+                    if weight:
+                        s = weight ** .3
+                        r += sr * s
+                        g += sg * s
+                        b += sb * s
+                changes.append((image, formatColor(min(1.0, r), min(1.0, g), min(1.0, b))))
+        changeColors(changes)
         refresh()
 
 
@@ -618,6 +780,9 @@ class FirstPersonPacmanGraphics(PacmanGraphics):
 
     def initialize(self, state, isBlue=False):
         self.isBlue = isBlue
+        if not self.renderEnabled:
+            self.previousState = state
+            return
         self.startGraphics(state)
         self.distributionImages = None
         self.drawStaticObjects(state)
@@ -626,7 +791,7 @@ class FirstPersonPacmanGraphics(PacmanGraphics):
 
     def lookAhead(self, config, state):
         """Optional helper used in some UIs — left as a no-op placeholder."""
-        if config.getDirection() == 'Stop':
+        if config.getDirection() == Directions.STOP:
             return
         # optionally draw visible ghosts (keeps compatibility)
         allGhosts = state.getGhostStates()
@@ -657,17 +822,43 @@ def add(x, y):
 SAVE_POSTSCRIPT = False
 POSTSCRIPT_OUTPUT_DIR = 'frames'
 FRAME_NUMBER = 0
-import os
+# Single background writer, created on the first saved frame; one worker
+# keeps frames landing on disk in order. The last write is kept so its
+# errors surface on the next save (or in flushFrames) instead of vanishing.
+_FRAME_WRITER = None
+_FRAME_PENDING = None
 
 
 def saveFrame():
-    """Save current canvas to file (postscript) if enabled."""
-    global SAVE_POSTSCRIPT, FRAME_NUMBER, POSTSCRIPT_OUTPUT_DIR
+    """
+    Save current canvas to file (postscript) if enabled.
+    The canvas is rendered to PostScript here, since Tk must be driven from
+    this thread, but the file is written in the background.
+    """
+    global SAVE_POSTSCRIPT, FRAME_NUMBER, POSTSCRIPT_OUTPUT_DIR, _FRAME_WRITER, _FRAME_PENDING
     if not SAVE_POSTSCRIPT:
         return
     if not os.path.exists(POSTSCRIPT_OUTPUT_DIR):
         os.mkdir(POSTSCRIPT_OUTPUT_DIR)
     name = os.path.join(POSTSCRIPT_OUTPUT_DIR, f'frame_{FRAME_NUMBER:08d}.ps')
     FRAME_NUMBER += 1
-    # writePostscript is defined in graphicsUtils
-    writePostscript(name)
+    if _FRAME_WRITER is None:
+        _FRAME_WRITER = ThreadPoolExecutor(max_workers=1)
+    if _FRAME_PENDING is not None:
+        # Re-raise a failed write of the previous frame, once
+        pending, _FRAME_PENDING = _FRAME_PENDING, None
+        pending.result()
+    # canvasPostscript / writePostscript are defined in graphicsUtils
+    _FRAME_PENDING = _FRAME_WRITER.submit(writePostscript, name, canvasPostscript())
+
+
+def flushFrames():
+    """Wait for queued frame writes to finish, re-raising any failure."""
+    global _FRAME_WRITER, _FRAME_PENDING
+    if _FRAME_WRITER is None:
+        return
+    pending = _FRAME_PENDING
+    _FRAME_WRITER.shutdown(wait=True)
+    _FRAME_WRITER = _FRAME_PENDING = None
+    if pending is not None:
+        pending.result()
@@ -1,7 +1,9 @@
 import sys
 import math
+import functools
 import time
 import tkinter
+from contextlib import contextmanager
 
 # Determine if running on Windows
 _WINDOWS = sys.platform == 'win32'
@@ -13,23 +15,43 @@ _canvas_xs = None
 _canvas_ys = None
 _bg_color = None
 
+# Redraw batching state (see batch_updates)
+_batch_depth = 0
+_batch_dirty = False
+
 # Key handling state
-_keysdown = {}
-_keyswaiting = {}
+_keysdown = set()
+_keyswaiting = set()
 _got_release = None
 
 _leftclick_loc = None
 _rightclick_loc = None
 _ctrl_leftclick_loc = None
 
+# Written by the key/click handlers so waits can block on wait_variable
+_key_var = None
+_click_var = None
+
+# Last value set per (item id, option) by changeText/changeColor(s), so
+# repeating an unchanged value skips the Tk call
+_item_state = {}
+
 
 # ------------------------------------------------------------
 #  COLOR / UTILITY FUNCTIONS
 # ------------------------------------------------------------
 
+# Two-digit hex for every channel byte
+_HEX_BYTES = tuple(f"{i:02x}" for i in range(256))
+
+
+@functools.lru_cache(maxsize=4096)
 def formatColor(r, g, b):
-    """Convert float RGB values (0–1) to Tkinter color string."""
-    return f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
+    """Convert float RGB values (0–1) to Tkinter color string (memoized)."""
+    # Clamp so blends that drift just outside 0–1 stay in the table
+    # instead of wrapping to ff or raising
+    return "#" + "".join(_HEX_BYTES[min(255, max(0, int(c*255)))]
+                         for c in (r, g, b))
 
 
 def colorToVector(color):
@@ -50,6 +72,24 @@ def sleep(secs):
         _root_window.mainloop()
 
 
+def animate(frames, secs):
+    """
+    Run each callable in `frames` `secs` apart on the Tk event loop and
+    return once the last one has had its full frame time. Tk coalesces
+    the redraws between frames itself, so callers needn't refresh().
+    """
+    if _root_window is None:
+        for frame in frames:
+            frame()
+            time.sleep(secs)
+        return
+    delay = int(1000 * secs)
+    for i, frame in enumerate(frames):
+        _root_window.after(i * delay, frame)
+    _root_window.after(len(frames) * delay, _root_window.quit)
+    _root_window.mainloop()
+
+
 # ------------------------------------------------------------
 #  WINDOW CREATION
 # ------------------------------------------------------------
@@ -57,7 +97,7 @@ def sleep(secs):
 def begin_graphics(width=640, height=480, color=formatColor(0, 0, 0), title=None):
     """Create the main Tkinter window and drawing canvas."""
 
-    global _root_window, _canvas, _canvas_xs, _canvas_ys, _bg_color
+    global _root_window, _canvas, _canvas_xs, _canvas_ys, _bg_color, _key_var, _click_var
 
     if _root_window is not None:
         _root_window.destroy()
@@ -66,10 +106,13 @@ def begin_graphics(width=640, height=480, color=formatColor(0, 0, 0), title=None
     _canvas_ys = height - 1
     _bg_color = color
 
+    _item_state.clear()
     _root_window = tkinter.Tk()
     _root_window.protocol('WM_DELETE_WINDOW', _destroy_window)
     _root_window.title(title or 'Graphics Window')
     _root_window.resizable(0, 0)
+    _key_var = tkinter.StringVar(master=_root_window)
+    _click_var = tkinter.StringVar(master=_root_window)
 
     _canvas = tkinter.Canvas(_root_window, width=width, height=height)
     _canvas.pack()
@@ -103,7 +146,7 @@ def _destroy_window(event=None):
 
 def end_graphics():
     """Close window cleanly."""
-    global _root_window, _canvas
+    global _root_window, _canvas, _key_var, _click_var
     try:
         sleep(1)
         if _root_window is not None:
@@ -111,6 +154,8 @@ def end_graphics():
     finally:
         _root_window = None
         _canvas = None
+        _key_var = _click_var = None
+        _item_state.clear()
         _clear_keys()
 
 
@@ -140,6 +185,17 @@ def square(pos, r, color, filled=True, behind=0):
     return polygon(coords, color, color if filled else "", filled, False, behind)
 
 
+def _arc_angles(endpoints):
+    """Return (start, extent) degrees for an arc running from start to end."""
+    if endpoints is None:
+        return 0, 359
+    start, end = endpoints
+    extent = end - start
+    if extent < 0:
+        extent %= 360
+    return start, extent
+
+
 def circle(pos, r, outlineColor, fillColor,
            endpoints=None, style='pieslice', width=2):
     """Draw an arc or full circle."""
@@ -147,17 +203,12 @@ def circle(pos, r, outlineColor, fillColor,
     x0, x1 = x - r - 1, x + r
     y0, y1 = y - r - 1, y + r
 
-    if endpoints is None:
-        start, end = 0, 359
-    else:
-        start, end = endpoints
-        while start > end:
-            end += 360
+    start, extent = _arc_angles(endpoints)
 
     return _canvas.create_arc(x0, y0, x1, y1,
                               outline=outlineColor,
                               fill=fillColor,
-                              extent=end-start,
+                              extent=extent,
                               start=start,
                               style=style,
                               width=width)
@@ -169,28 +220,150 @@ def line(here, there, color=formatColor(0, 0, 0), width=2):
     )
 
 
+# ------------------------------------------------------------
+#  BATCHED DRAWING
+# ------------------------------------------------------------
+
+def _create_many(kind, items):
+    """
+    Create many canvas items with a single Tcl round trip.
+    `items` is a list of (coords, options) pairs; returns the new item ids.
+    """
+    if not items:
+        return []
+    path = str(_canvas)
+    cmds = []
+    for coords, options in items:
+        args = ' '.join(str(c) for c in coords)
+        opts = ' '.join(f'-{k} {{{v}}}' for k, v in options.items())
+        cmds.append(f'[{path} create {kind} {args} {opts}]')
+    ids = _canvas.tk.eval('list ' + ' '.join(cmds))
+    return [int(i) for i in _canvas.tk.splitlist(ids)]
+
+
+def lines(segments, color=formatColor(0, 0, 0), width=2):
+    """Draw many separate line segments [(here, there), ...] in one call."""
+    opts = {'fill': color, 'width': width}
+    return _create_many('line', [((here[0], here[1], there[0], there[1]), opts)
+                                 for here, there in segments])
+
+
+def arcs(specs, outlineColor, fillColor, style='pieslice', width=2):
+    """
+    Draw many arcs/circles [(pos, r, endpoints), ...] in one call;
+    each entry is drawn exactly as circle() would draw it.
+    """
+    items = []
+    for pos, r, endpoints in specs:
+        x, y = pos
+        start, extent = _arc_angles(endpoints)
+        items.append(((x - r - 1, y - r - 1, x + r, y + r),
+                      {'outline': outlineColor, 'fill': fillColor,
+                       'extent': extent, 'start': start,
+                       'style': style, 'width': width}))
+    return _create_many('arc', items)
+
+
+def squares(specs, behind=0):
+    """
+    Draw many filled squares [(pos, r, color), ...] in one call;
+    each entry is drawn exactly as square() would draw it.
+    """
+    items = []
+    for (x, y), r, color in specs:
+        items.append(((x - r, y - r, x + r, y - r, x + r, y + r, x - r, y + r),
+                      {'outline': color, 'fill': color, 'smooth': 0, 'width': 1}))
+    ids = _create_many('polygon', items)
+    if behind > 0 and ids:
+        path = str(_canvas)
+        _canvas.tk.eval('\n'.join(f'{path} lower {i} {behind}' for i in ids))
+    return ids
+
+
+def changeColors(changes):
+    """Apply many changeColor() calls [(obj_id, newColor), ...] in one call."""
+    changes = [(obj_id, color) for obj_id, color in changes
+               if _item_state.get((obj_id, 'fill')) != color]
+    if not changes:
+        return
+    for obj_id, color in changes:
+        _item_state[obj_id, 'fill'] = color
+    path = str(_canvas)
+    _canvas.tk.eval('\n'.join(f'{path} itemconfigure {obj_id} -fill {{{color}}}'
+                              for obj_id, color in changes))
+
+
+@functools.lru_cache(maxsize=64)
+def _fontSpec(font, size, style):
+    """Tk font description for text(); size is in points."""
+    return (font, str(size), style)
+
+
+@functools.lru_cache(maxsize=64)
+def _pixelFontSpec(font, size, style):
+    """Tk font description for changeText(); size is in pixels."""
+    return (font, f"-{size}", style)
+
+
 def text(pos, color, contents, font='Helvetica', size=12,
          style='normal', anchor="nw"):
     x, y = pos
-    font = (font, str(size), style)
-    return _canvas.create_text(x, y, fill=color,
-                               text=contents, font=font, anchor=anchor)
+    obj_id = _canvas.create_text(x, y, fill=color, text=contents,
+                                 font=_fontSpec(font, size, style),
+                                 anchor=anchor)
+    _item_state[obj_id, 'text'] = contents
+    return obj_id
 
 
 def changeText(obj_id, newText, font=None, size=12, style='normal'):
-    _canvas.itemconfigure(obj_id, text=newText)
+    options = {}
+    if _item_state.get((obj_id, 'text')) != newText:
+        options['text'] = newText
     if font:
-        _canvas.itemconfigure(obj_id, font=(font, f"-{size}", style))
+        spec = _pixelFontSpec(font, size, style)
+        if _item_state.get((obj_id, 'font')) != spec:
+            options['font'] = spec
+    if not options:
+        return
+    for option, value in options.items():
+        _item_state[obj_id, option] = value
+    _canvas.itemconfigure(obj_id, **options)
 
 
 def changeColor(obj_id, newColor):
+    if _item_state.get((obj_id, 'fill')) == newColor:
+        return
+    _item_state[obj_id, 'fill'] = newColor
     _canvas.itemconfigure(obj_id, fill=newColor)
 
 
 def refresh():
+    global _batch_dirty
+    if _batch_depth:
+        _batch_dirty = True
+        return
     _canvas.update_idletasks()
 
 
+@contextmanager
+def batch_updates():
+    """
+    Defer refresh() calls made inside the block (including the ones in
+    move_to / move_by) and flush them once with a single update_idletasks()
+    when the outermost block exits. Blocks may be nested.
+    """
+    global _batch_depth, _batch_dirty
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if _batch_depth == 0 and _batch_dirty:
+            _batch_dirty = False
+            if _canvas is not None:
+                _canvas.update_idletasks()
+
+
 # ------------------------------------------------------------
 #  MOVEMENT
 # ------------------------------------------------------------
@@ -228,20 +401,18 @@ def moveCircle(obj, pos, r, endpoints=None):
     x0, x1 = x - r - 1, x + r
     y0, y1 = y - r - 1, y + r
 
-    if endpoints is None:
-        start, end = 0, 359
-    else:
-        start, end = endpoints
-        while start > end:
-            end += 360
+    start, extent = _arc_angles(endpoints)
 
-    edit(obj, ('start', start), ('extent', end - start))
+    edit(obj, ('start', start), ('extent', extent))
     move_to(obj, x0, y0)
 
 
 def edit(obj, *args):
     """Generic update to Tk canvas object config."""
-    _canvas.itemconfigure(obj, **dict(args))
+    options = dict(args)
+    for option in options:
+        _item_state.pop((obj, option), None)
+    _canvas.itemconfigure(obj, **options)
 
 
 # ------------------------------------------------------------
@@ -250,21 +421,23 @@ def edit(obj, *args):
 
 def _keypress(event):
     global _got_release
-    _keysdown[event.keysym] = 1
-    _keyswaiting[event.keysym] = 1
+    _keysdown.add(event.keysym)
+    _keyswaiting.add(event.keysym)
     _got_release = None
+    if _key_var is not None:
+        _key_var.set(event.keysym)
 
 
 def _keyrelease(event):
     global _got_release
-    _keysdown.pop(event.keysym, None)
+    _keysdown.discard(event.keysym)
     _got_release = True
 
 
 def _clear_keys(event=None):
     global _keysdown, _keyswaiting, _got_release
-    _keysdown = {}
-    _keyswaiting = {}
+    _keysdown = set()
+    _keyswaiting = set()
     _got_release = None
 
 
@@ -274,23 +447,31 @@ def keys_pressed():
         _root_window.dooneevent(tkinter._tkinter.DONT_WAIT)
         if _got_release:
             _root_window.dooneevent(tkinter._tkinter.DONT_WAIT)
-    return list(_keysdown.keys())
+    return list(_keysdown)
 
 
 def keys_waiting():
     """Return keys that were pressed since last call."""
     global _keyswaiting
-    keys = list(_keyswaiting.keys())
-    _keyswaiting = {}
+    keys = list(_keyswaiting)
+    _keyswaiting = set()
     return keys
 
 
+def _wait_on(var):
+    """Block until a handler writes `var`; poll when there is no window."""
+    if _root_window is None or var is None:
+        sleep(0.05)
+    else:
+        _root_window.wait_variable(var)
+
+
 def wait_for_keys():
     """Block until some key is pressed."""
-    keys = []
+    keys = keys_pressed()
     while not keys:
+        _wait_on(_key_var)
         keys = keys_pressed()
-        sleep(0.05)
     return keys
 
 
@@ -301,16 +482,22 @@ def wait_for_keys():
 def _leftclick(event):
     global _leftclick_loc
     _leftclick_loc = (event.x, event.y)
+    if _click_var is not None:
+        _click_var.set('left')
 
 
 def _rightclick(event):
     global _rightclick_loc
     _rightclick_loc = (event.x, event.y)
+    if _click_var is not None:
+        _click_var.set('right')
 
 
 def _ctrl_leftclick(event):
     global _ctrl_leftclick_loc
     _ctrl_leftclick_loc = (event.x, event.y)
+    if _click_var is not None:
+        _click_var.set('ctrl_left')
 
 
 def wait_for_click():
@@ -329,17 +516,24 @@ def wait_for_click():
             loc = _ctrl_leftclick_loc
             _ctrl_leftclick_loc = None
             return loc, 'ctrl_left'
-        sleep(0.05)
+        _wait_on(_click_var)
 
 
 # ------------------------------------------------------------
 #  EXPORT
 # ------------------------------------------------------------
 
-def writePostscript(filename):
-    """Save canvas to PostScript."""
+def canvasPostscript():
+    """Return the canvas rendered as a PostScript string."""
+    return _canvas.postscript(pageanchor='sw', y='0', x='0')
+
+
+def writePostscript(filename, postscript=None):
+    """Save canvas (or an already captured `postscript` string) to PostScript."""
+    if postscript is None:
+        postscript = canvasPostscript()
     with open(filename, 'w') as f:
-        f.write(_canvas.postscript(pageanchor='sw', y='0', x='0'))
+        f.write(postscript)
 
 # ------------------------------------------------------------
 #  CANVAS OBJECT REMOVAL
@@ -349,4 +543,19 @@ def remove_from_screen(obj_id):
     """Delete a canvas object by its ID."""
     global _canvas
     if _canvas:
-        _canvas.delete(obj_id)
\ No newline at end of file
+        _canvas.delete(obj_id)
+    for option in ('text', 'font', 'fill'):
+        _item_state.pop((obj_id, option), None)
+
+
+def hide_from_screen(obj_id):
+    """Hide a canvas object without deleting it, so it can be shown again."""
+    if _canvas:
+        _canvas.itemconfigure(obj_id, state='hidden')
+
+
+def show_on_screen(obj_id):
+    """Show a hidden canvas object again, raised above everything drawn so far."""
+    if _canvas:
+        _canvas.itemconfigure(obj_id, state='normal')
+        _canvas.tag_raise(obj_id)
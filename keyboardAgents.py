@@ -15,12 +15,30 @@ class KeyboardAgent(Agent):
     SOUTH_KEY = 's'
     STOP_KEY = 'q'
 
+    # Extra keys accepted for each direction
+    ARROW_KEYS = {
+        Directions.WEST: 'Left',
+        Directions.EAST: 'Right',
+        Directions.NORTH: 'Up',
+        Directions.SOUTH: 'Down',
+    }
+
     def __init__(self, index=0):
         # maintain Agent indexing
         super().__init__(index)
         self.lastMove = Directions.STOP
         self.index = index
-        self.keys = []
+        self.keys = frozenset()
+
+        # (keys, direction) in priority order: a later match wins
+        self.moveKeys = tuple(
+            (frozenset(k for k in (key, self.ARROW_KEYS.get(direction)) if k),
+             direction)
+            for key, direction in ((self.WEST_KEY, Directions.WEST),
+                                   (self.EAST_KEY, Directions.EAST),
+                                   (self.NORTH_KEY, Directions.NORTH),
+                                   (self.SOUTH_KEY, Directions.SOUTH))
+        )
 
     def getAction(self, state):
         """
@@ -32,7 +50,7 @@ class KeyboardAgent(Agent):
 
         keys = keys_waiting() + keys_pressed()
         if keys:
-            self.keys = keys
+            self.keys = frozenset(keys)
 
         legal = state.getLegalActions(self.index)
         move = self.getMove(legal)
@@ -55,14 +73,9 @@ class KeyboardAgent(Agent):
     def getMove(self, legal):
         """Map current keys to a direction if that direction is legal."""
         move = Directions.STOP
-        if (self.WEST_KEY in self.keys or 'Left' in self.keys) and Directions.WEST in legal:
-            move = Directions.WEST
-        if (self.EAST_KEY in self.keys or 'Right' in self.keys) and Directions.EAST in legal:
-            move = Directions.EAST
-        if (self.NORTH_KEY in self.keys or 'Up' in self.keys) and Directions.NORTH in legal:
-            move = Directions.NORTH
-        if (self.SOUTH_KEY in self.keys or 'Down' in self.keys) and Directions.SOUTH in legal:
-            move = Directions.SOUTH
+        for keys, direction in self.moveKeys:
+            if direction in legal and not keys.isdisjoint(self.keys):
+                move = direction
         return move
 
 
@@ -78,14 +91,5 @@ class KeyboardAgent2(KeyboardAgent):
     SOUTH_KEY = 'k'
     STOP_KEY = 'u'
 
-    def getMove(self, legal):
-        move = Directions.STOP
-        if (self.WEST_KEY in self.keys) and Directions.WEST in legal:
-            move = Directions.WEST
-        if (self.EAST_KEY in self.keys) and Directions.EAST in legal:
-            move = Directions.EAST
-        if (self.NORTH_KEY in self.keys) and Directions.NORTH in legal:
-            move = Directions.NORTH
-        if (self.SOUTH_KEY in self.keys) and Directions.SOUTH in legal:
-            move = Directions.SOUTH
-        return move
+    # The arrow keys stay with the first player
+    ARROW_KEYS = {}
@@ -1,13 +1,23 @@
 from util import manhattanDistance
-from game import Grid
+from game import Grid, Directions
 import os
 import random
-from functools import reduce
 
 
 # Cache for visibility matrices
 VISIBILITY_MATRIX_CACHE = {}
 
+# Half-cell step each visibility ray takes, by direction name
+VISIBILITY_RAY_STEPS = {
+    Directions.NORTH: (-0.5, 0),
+    Directions.SOUTH: (0.5, 0),
+    Directions.WEST: (0, -0.5),
+    Directions.EAST: (0, 0.5),
+}
+
+# Parsed layout files, keyed by (absolute path, modification time)
+LAYOUT_FILE_CACHE = {}
+
 
 class Layout:
     """
@@ -27,6 +37,9 @@ class Layout:
         self.numGhosts = 0
 
         self.layoutText = layoutText
+        self.layoutKey = None
+        self.layoutString = None
+        self.legalPositions = None
         self.processLayoutText(layoutText)
         self.totalFood = len(self.food.asList())
 
@@ -38,47 +51,70 @@ class Layout:
     # -----------------------------------------------------
     def initializeVisibilityMatrix(self):
         """
-        Builds a mapping of visible cells from each cell in each direction.
-        This is computationally expensive but cached.
+        Builds, for each open cell and direction, how far a ray cast from
+        that cell can travel in half-cell steps before it hits a wall or
+        leaves the maze. A ray from (x, y) with step (dx, dy) sees the
+        points (x + k*dx, y + k*dy) for k = 1..steps; see isVisibleFrom.
+        Computed with one run-length sweep per row and column, and cached.
         """
         global VISIBILITY_MATRIX_CACHE
-        key = reduce(str.__add__, self.layoutText)
+        if self.layoutKey is None:
+            # Keep the row breaks, or differently shaped layouts with the
+            # same characters would share a cache entry
+            self.layoutKey = '\n'.join(self.layoutText)
+        key = self.layoutKey
 
         if key not in VISIBILITY_MATRIX_CACHE:
-            from game import Directions
-
-            offsets = [(-0.5, 0), (0.5, 0), (0, -0.5), (0, 0.5)]
-            dirs = [Directions.NORTH, Directions.SOUTH,
-                    Directions.WEST, Directions.EAST]
-
-            vis = Grid(
-                self.width, self.height,
-                {Directions.NORTH: set(),
-                 Directions.SOUTH: set(),
-                 Directions.EAST: set(),
-                 Directions.WEST: set(),
-                 Directions.STOP: set()}
-            )
-
-            # Visibility propagation
-            for x in range(self.width):
-                for y in range(self.height):
-                    if not self.walls[x][y]:
-                        for (dx, dy), direction in zip(offsets, dirs):
-                            nextx, nexty = x + dx, y + dy
-
-                            # Pseudo-continuous ray casting
-                            while True:
-                                ix, iy = int(nextx), int(nexty)
-                                if ix < 0 or iy < 0 or ix >= self.width or iy >= self.height:
-                                    break
-                                if self.walls[ix][iy]:
-                                    break
-
-                                vis[x][y][direction].add((nextx, nexty))
-
-                                nextx += dx
-                                nexty += dy
+            # Index the grid's column lists directly rather than through
+            # Grid.__getitem__
+            walls = self.walls.data
+            width, height = self.width, self.height
+
+            def runs(cells):
+                """
+                For each index along a line of wall flags: how many open
+                cells follow it, and whether that run ends at the edge of
+                the maze rather than at a wall.
+                """
+                ahead = [0] * len(cells)
+                edge = [True] * len(cells)
+                for i in range(len(cells) - 2, -1, -1):
+                    if cells[i + 1]:
+                        ahead[i], edge[i] = 0, False
+                    else:
+                        ahead[i], edge[i] = ahead[i + 1] + 1, edge[i + 1]
+                return ahead, edge
+
+            vis = [[None] * height for _ in range(width)]
+            columns = walls
+            rows = [list(row) for row in zip(*walls)]
+            up = [runs(col) for col in columns]
+            down = [runs(col[::-1]) for col in columns]
+            right = [runs(row) for row in rows]
+            left = [runs(row[::-1]) for row in rows]
+
+            def steps(ahead, edge, i, positive):
+                # Stepping forwards, the first half step stays inside the
+                # starting cell, giving 2 * run + 1 points. Stepping
+                # backwards, int() truncates towards zero, so a ray that
+                # runs off the low edge gets one extra point at -0.5.
+                if positive:
+                    return 2 * ahead[i] + 1
+                return 2 * ahead[i] + (1 if edge[i] else 0)
+
+            for x in range(width):
+                for y in range(height):
+                    if walls[x][y]:
+                        continue
+                    rx, ry = width - 1 - x, height - 1 - y
+                    vis[x][y] = {
+                        # same pairing as VISIBILITY_RAY_STEPS
+                        Directions.NORTH: steps(*left[y], rx, False),
+                        Directions.SOUTH: steps(*right[y], x, True),
+                        Directions.WEST: steps(*down[x], ry, False),
+                        Directions.EAST: steps(*up[x], y, True),
+                        Directions.STOP: 0,
+                    }
 
             self.visibility = vis
             VISIBILITY_MATRIX_CACHE[key] = vis
@@ -94,11 +130,15 @@ class Layout:
 
     def getRandomLegalPosition(self):
         """Return a random non-wall position."""
-        while True:
-            x = random.randrange(self.width)
-            y = random.randrange(self.height)
-            if not self.isWall((x, y)):
-                return (x, y)
+        if self.legalPositions is None:
+            walls = self.walls.data
+            self.legalPositions = tuple(
+                (x, y)
+                for x in range(self.width)
+                for y in range(self.height)
+                if not walls[x][y]
+            )
+        return random.choice(self.legalPositions)
 
     def getRandomCorner(self):
         """Return one of the four corners."""
@@ -121,15 +161,50 @@ class Layout:
         return max(poses, key=lambda p: manhattanDistance(p, pacPos))
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
-        """Check if ghostPos is in the visibility set of pacPos."""
+        """Check if ghostPos lies on the visibility ray cast from pacPos."""
         row, col = int(pacPos[0]), int(pacPos[1])
-        return ghostPos in self.visibility[row][col][pacDirection]
+        steps = self.visibility[row][col][pacDirection]
+        dx, dy = VISIBILITY_RAY_STEPS.get(pacDirection, (0, 0))
+        gx, gy = ghostPos
+        if dx:
+            if gy != col:
+                return False
+            k = (gx - row) / dx
+        elif dy:
+            if gx != row:
+                return False
+            k = (gy - col) / dy
+        else:
+            return False
+        return k == int(k) and 1 <= k <= steps
 
     def __str__(self):
-        return "\n".join(self.layoutText)
+        if self.layoutString is None:
+            self.layoutString = "\n".join(self.layoutText)
+        return self.layoutString
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        """
+        Copy without reparsing. Walls and layout text are never modified
+        after parsing, so the copy shares them; food, capsules and agent
+        positions get their own containers.
+        """
+        new = Layout.__new__(Layout)
+        new.width = self.width
+        new.height = self.height
+        new.walls = self.walls
+        new.food = self.food.copy()
+        new.capsules = list(self.capsules)
+        new.agentPositions = list(self.agentPositions)
+        new.numGhosts = self.numGhosts
+        new.layoutText = self.layoutText
+        new.layoutKey = self.layoutKey
+        new.layoutString = self.layoutString
+        new.legalPositions = self.legalPositions
+        new.totalFood = self.totalFood
+        if hasattr(self, 'visibility'):
+            new.visibility = self.visibility
+        return new
 
     # -----------------------------------------------------
     #   Parse layout text lines into walls/food/capsules/etc.
@@ -147,40 +222,71 @@ class Layout:
         """
 
         maxY = self.height - 1
+        walls = self.walls.data
+        food = self.food.data
 
         for y in range(self.height):
+            row = layoutText[maxY - y]
             for x in range(self.width):
-                char = layoutText[maxY - y][x]
-                self.processLayoutChar(x, y, char)
-
-        # Sort agent positions by ID: (0 for pacman, then ghosts)
-        self.agentPositions.sort()
-
-        # Convert the format to: (isPacman, position)
-        self.agentPositions = [(i == 0, pos) for i, pos in self.agentPositions]
+                char = row[x]
+                # Walls, food and open floor make up nearly every cell, so
+                # handle them inline and dispatch only the rare characters.
+                if char == '%':
+                    walls[x][y] = True
+                elif char == '.':
+                    food[x][y] = True
+                elif char != ' ':
+                    handler = LAYOUT_CHAR_HANDLERS.get(char)
+                    if handler is not None:
+                        handler(self, x, y, char)
+
+        # Order agents by ID (0 for pacman, then ghosts) and convert the
+        # format to: (isPacman, position)
+        self.agentPositions = [(i == 0, pos) for i, pos in sorted(self.agentPositions)]
 
     def processLayoutChar(self, x, y, char):
         """Map a single character to game object(s)."""
+        handler = LAYOUT_CHAR_HANDLERS.get(char)
+        if handler is not None:
+            handler(self, x, y, char)
+
+
+# -----------------------------------------------------
+#   Layout character handlers
+# -----------------------------------------------------
+def _addWall(layout, x, y, char):
+    layout.walls[x][y] = True
 
-        if char == '%':
-            self.walls[x][y] = True
 
-        elif char == '.':
-            self.food[x][y] = True
+def _addFood(layout, x, y, char):
+    layout.food[x][y] = True
 
-        elif char == 'o':
-            self.capsules.append((x, y))
 
-        elif char == 'P':  # Pacman
-            self.agentPositions.append((0, (x, y)))
+def _addCapsule(layout, x, y, char):
+    layout.capsules.append((x, y))
 
-        elif char == 'G':  # Ghost (generic)
-            self.agentPositions.append((1, (x, y)))
-            self.numGhosts += 1
 
-        elif char in ['1', '2', '3', '4']:  # Specific ghost index
-            self.agentPositions.append((int(char), (x, y)))
-            self.numGhosts += 1
+def _addPacman(layout, x, y, char):
+    layout.agentPositions.append((0, (x, y)))
+
+
+def _addGhost(layout, x, y, char):
+    # 'G' is a generic ghost; '1'-'4' give the ghost's index
+    layout.agentPositions.append((1 if char == 'G' else int(char), (x, y)))
+    layout.numGhosts += 1
+
+
+LAYOUT_CHAR_HANDLERS = {
+    '%': _addWall,
+    '.': _addFood,
+    'o': _addCapsule,
+    'P': _addPacman,
+    'G': _addGhost,
+    '1': _addGhost,
+    '2': _addGhost,
+    '3': _addGhost,
+    '4': _addGhost,
+}
 
 
 # -----------------------------------------------------
@@ -207,10 +313,16 @@ def getLayout(name, back=2):
 
 
 def tryToLoad(fullname):
-    """Try reading a layout file and return a Layout object if successful."""
+    """
+    Try reading a layout file and return a Layout object if successful.
+    Each file is parsed once per modification time; callers get a copy.
+    """
     if not os.path.exists(fullname):
         return None
 
-    with open(fullname) as f:
-        lines = [line.strip() for line in f]
-    return Layout(lines)
+    key = (os.path.abspath(fullname), os.stat(fullname).st_mtime_ns)
+    if key not in LAYOUT_FILE_CACHE:
+        with open(fullname) as f:
+            lines = [line.strip() for line in f]
+        LAYOUT_FILE_CACHE[key] = Layout(lines)
+    return LAYOUT_FILE_CACHE[key].deepCopy()
@@ -11,6 +11,7 @@ import game
 
 # Replay memory
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Neural nets
 import torch              # Import PyTorch
@@ -30,6 +31,7 @@ params = {
 
     'discount': 0.95,       # Discount rate (gamma value)
     'lr': .0002,            # Learning reate
+    'target_update': 0,     # Steps between target network syncs (0 = no target network)
     # 'rms_decay': 0.99,      # RMS Prop decay (switched to adam)
     # 'rms_eps': 1e-6,        # RMS Prop epsilon (switched to adam)
 
@@ -73,6 +75,11 @@ class PacmanDQN(game.Agent):
         self.replay_mem = deque()
         self.last_scores = deque()
 
+        # Background thread that builds the next training batch's arrays
+        # while the current train_step runs
+        self.batch_pool = ThreadPoolExecutor(max_workers=1)
+        self.next_batch = None
+
 
     def getMove(self, state):
         # Exploit / Explore
@@ -83,11 +90,12 @@ class PacmanDQN(game.Agent):
             state_np = np.reshape(self.current_state, 
                                   (1, self.params['width'], self.params['height'], 6))
             
-            # 2. Convert to a PyTorch tensor
-            state_tensor = torch.from_numpy(state_np).float()
+            # 2. Convert to a PyTorch tensor on the model's device
+            state_tensor = self.qnet.to_tensor(state_np)
             
             # 3. Permute dimensions from [1, H, W, C] to [1, C, H, W]
-            state_tensor = state_tensor.permute(0, 3, 1, 2)
+            #    (channels-last in memory, matching the model's layout)
+            state_tensor = state_tensor.permute(0, 3, 1, 2).contiguous(memory_format=torch.channels_last)
 
             # 4. Set model to evaluation mode (disables dropout, etc.)
             self.qnet.eval()
@@ -97,7 +105,7 @@ class PacmanDQN(game.Agent):
                 q_values = self.qnet(state_tensor)
 
             # 6. Convert the output tensor back to a numpy array
-            self.Q_pred = q_values.numpy()[0] # [0] to remove the batch dimension
+            self.Q_pred = q_values.cpu().numpy()[0] # [0] to remove the batch dimension
 
 
             self.Q_global.append(max(self.Q_pred))
@@ -216,38 +224,49 @@ class PacmanDQN(game.Agent):
     def train(self):
         # Train
         if (self.local_cnt > self.params['train_start']):
-            batch = random.sample(self.replay_mem, self.params['batch_size'])
-            batch_s = [] # States (s)
-            batch_r = [] # Rewards (r)
-            batch_a = [] # Actions (a)
-            batch_n = [] # Next states (s')
-            batch_t = [] # Terminal state (t)
-
-            for i in batch:
-                batch_s.append(i[0])
-                batch_r.append(i[1])
-                batch_a.append(i[2])
-                batch_n.append(i[3])
-                batch_t.append(i[4])
-            batch_s = np.array(batch_s)
-            batch_r = np.array(batch_r)
-            batch_a = self.get_onehot(np.array(batch_a))
-            batch_n = np.array(batch_n)
-            batch_t = np.array(batch_t)
+            # The batch used now was stacked in the background during the
+            # previous step, so it lags the replay memory by one transition.
+            if self.next_batch is None:
+                batch = self.make_batch(random.sample(self.replay_mem, self.params['batch_size']))
+            else:
+                batch = self.next_batch.result()
+
+            # Sample here, on the main thread, since the replay memory keeps
+            # changing; only array stacking is handed to the worker.
+            self.next_batch = self.batch_pool.submit(
+                self.make_batch, random.sample(self.replay_mem, self.params['batch_size']))
+
+            batch_s, batch_a, batch_t, batch_n, batch_r = batch
 
             # Set model to training mode (enables dropout, etc., if they exist)
             self.qnet.train() 
             
             # Call our new PyTorch training function
+            # cost_disp is a device tensor; call .item() on it only when it is displayed
             self.cnt, self.cost_disp = self.qnet.train_step(batch_s, batch_a, batch_t, batch_n, batch_r)
 
-
-    def get_onehot(self, actions):
-        """ Create list of vectors with 1 values at index of action in list """
-        actions_onehot = np.zeros((self.params['batch_size'], 4))
-        for i in range(len(actions)):                                           
-            actions_onehot[i][int(actions[i])] = 1      
-        return actions_onehot   
+    def make_batch(self, batch):
+        """ Stack sampled experiences into (s, a, t, s', r) batch arrays """
+        batch_s = [] # States (s)
+        batch_r = [] # Rewards (r)
+        batch_a = [] # Actions (a)
+        batch_n = [] # Next states (s')
+        batch_t = [] # Terminal state (t)
+
+        for i in batch:
+            batch_s.append(i[0])
+            batch_r.append(i[1])
+            batch_a.append(i[2])
+            batch_n.append(i[3])
+            batch_t.append(i[4])
+        # Build the batch arrays with the dtypes the model's buffers use
+        # so handing them to PyTorch needs no extra cast
+        batch_s = np.array(batch_s, dtype=np.uint8)
+        batch_r = np.array(batch_r, dtype=np.float32)
+        batch_a = np.array(batch_a, dtype=np.int64)
+        batch_n = np.array(batch_n, dtype=np.uint8)
+        batch_t = np.array(batch_t, dtype=np.float32)
+        return batch_s, batch_a, batch_t, batch_n, batch_r
 
     def mergeStateMatrices(self, stateMatrices):
         """ Merge state matrices to one state tensor """
@@ -342,7 +361,9 @@ class PacmanDQN(game.Agent):
         # wall, pacman, ghost, food and capsule matrices
         # width, height = state.data.layout.width, state.data.layout.height 
         width, height = self.params['width'], self.params['height']
-        observation = np.zeros((6, height, width))
+        # The planes are binary masks, so uint8 is enough; the model casts
+        # them to float on its device.
+        observation = np.zeros((6, height, width), dtype=np.uint8)
 
         observation[0] = getWallMatrix(state)
         observation[1] = getPacmanMatrix(state)
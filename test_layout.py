@@ -0,0 +1,41 @@
+import unittest
+
+import layout
+from game import Directions
+
+
+class VisibilityCacheTest(unittest.TestCase):
+
+    def test_layouts_with_same_characters_in_different_shapes(self):
+        # Both join to '%%  ' without row breaks
+        tall = layout.Layout(['%%', '  '])
+        wide = layout.Layout(['%%  '])
+        tall.initializeVisibilityMatrix()
+        wide.initializeVisibilityMatrix()
+
+        self.assertIsNot(tall.visibility, wide.visibility)
+        self.assertEqual(len(wide.visibility), wide.width)
+        self.assertTrue(wide.isVisibleFrom((2, 0.5), (2, 0), Directions.EAST))
+        self.assertTrue(tall.isVisibleFrom((1, 0), (0, 0), Directions.SOUTH))
+
+
+
+class ProcessLayoutTextTest(unittest.TestCase):
+
+    def test_columns_past_the_first_row_are_dropped(self):
+        # The grid is as wide as the first row; the extra 'P' and '%' in
+        # the middle row lie outside it and must be ignored
+        lay = layout.Layout(['%%%', '%.%P%', '%%%'])
+
+        self.assertEqual(lay.width, 3)
+        self.assertEqual(lay.agentPositions, [])
+        self.assertEqual(lay.food.asList(), [(1, 1)])
+        self.assertEqual(lay.walls.count(), 8)
+
+    def test_short_row_raises(self):
+        with self.assertRaises(IndexError):
+            layout.Layout(['%%%', '%P', '%%%'])
+
+
+if __name__ == '__main__':
+    unittest.main()
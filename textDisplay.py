@@ -1,3 +1,4 @@
+import sys
 import time
 
 # These globals are kept for compatibility with the original Pacman framework.
@@ -23,7 +24,8 @@ class NullGraphics:
         return True
 
     def pause(self):
-        time.sleep(SLEEP_TIME)
+        if SLEEP_TIME:
+            time.sleep(SLEEP_TIME)
 
     def draw(self, state):
         # Still prints a state if someone explicitly calls draw()
@@ -40,6 +42,7 @@ class PacmanGraphics:
     """
     Minimal text-based display for Pacman.
     Prints the board state to stdout every few moves and shows score.
+    Set QUIET to stop drawing boards (move info still follows DISPLAY_MOVES).
     """
 
     def __init__(self, speed=None):
@@ -51,6 +54,10 @@ class PacmanGraphics:
         self.turn = 0
         self.agentCounter = 0
 
+        # Board printouts are collected here and written out in batches
+        self.outBuffer = []
+        self.flushEvery = max(1, DRAW_EVERY * 10)
+
         # `pacman.nearestPoint` is optional; import lazily.
         try:
             import pacman
@@ -74,6 +81,12 @@ class PacmanGraphics:
         numAgents = len(state.agentStates)
         self.agentCounter = (self.agentCounter + 1) % numAgents
 
+        # Nothing to show: just keep the turn count going
+        if QUIET and not DISPLAY_MOVES:
+            if self.agentCounter == 0:
+                self.turn += 1
+            return
+
         # Every full round of agent moves = 1 "turn"
         if self.agentCounter == 0:
             self.turn += 1
@@ -90,6 +103,7 @@ class PacmanGraphics:
         # If game ends, always print final state
         if getattr(state, "_win", False) or getattr(state, "_lose", False):
             self.draw(state)
+            self.flush()
 
     def _printMoveInfo(self, state, numAgents):
         """Internal helper to print detailed turn information."""
@@ -105,7 +119,7 @@ class PacmanGraphics:
                 pacpos = state.getPacmanPosition()
                 ghosts = [state.getGhostPosition(i) for i in range(1, numAgents)]
 
-            print(
+            self.write(
                 f"{self.turn:4d}) P: {pacpos!s:<8} | "
                 f"Score: {state.score:<5} | Ghosts: {ghosts}"
             )
@@ -114,11 +128,29 @@ class PacmanGraphics:
             pass
 
     def pause(self):
-        time.sleep(SLEEP_TIME)
+        if SLEEP_TIME:
+            # Show everything drawn so far before holding the frame
+            self.flush()
+            time.sleep(SLEEP_TIME)
 
     def draw(self, state):
         """Print the string representation of the board."""
-        print(state)
+        if QUIET:
+            return
+        self.write(str(state))
+
+    def write(self, text):
+        """Queue a line of output, flushing once enough has built up."""
+        self.outBuffer.append(text + "\n")
+        if len(self.outBuffer) >= self.flushEvery:
+            self.flush()
+
+    def flush(self):
+        """Write all queued output to stdout with a single call."""
+        if self.outBuffer:
+            sys.stdout.write("".join(self.outBuffer))
+            self.outBuffer.clear()
+            sys.stdout.flush()
 
     def finish(self):
-        pass
+        self.flush()